@@ -1,8 +1,63 @@
-from .core import configure
-from .models import MipsState, JumpType, TestResult, MemoryEntry, MemorySize
-from .harness import create_harness
-from .runner import test_assemble, test_run, test_final_state
-from .json import load_and_run_tests
+import importlib
+from typing import TYPE_CHECKING
+
+# public names and the submodules defining them. submodules are imported on first
+# access (PEP 562), so e.g. importing MipsState does not load the runner
+_EXPORTS = {
+    "configure": "core",
+    "MipsState": "models",
+    "JumpType": "models",
+    "TestResult": "models",
+    "MemoryEntry": "models",
+    "MemorySize": "models",
+    "create_harness": "harness",
+    "test_assemble": "runner",
+    "test_run": "runner",
+    "test_final_state": "runner",
+    "test_final_states": "runner",
+    "test_final_state_batch": "runner",
+    "compile_expected": "runner",
+    "CompiledSpec": "runner",
+    "clear_run_cache": "runner",
+    "load_and_run_tests": "json",
+}
+
+# submodules are imported on first access too, so e.g. mips_tester.core.config works
+# after a plain `import mips_tester`
+_SUBMODULES = ("cache", "core", "harness", "json", "models", "runner")
+
+if TYPE_CHECKING:
+    from .core import configure
+    from .models import MipsState, JumpType, TestResult, MemoryEntry, MemorySize
+    from .harness import create_harness
+    from .runner import (
+        test_assemble,
+        test_run,
+        test_final_state,
+        test_final_states,
+        test_final_state_batch,
+        compile_expected,
+        CompiledSpec,
+        clear_run_cache,
+    )
+    from .json import load_and_run_tests
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        # importing a submodule also sets it on the package
+        return importlib.import_module(f".{name}", __name__)
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    # cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__) | set(_SUBMODULES))
+
 
 __all__ = [
     "configure",
@@ -15,5 +70,10 @@ __all__ = [
     "test_assemble",
     "test_run",
     "test_final_state",
+    "test_final_states",
+    "test_final_state_batch",
+    "compile_expected",
+    "CompiledSpec",
+    "clear_run_cache",
     "load_and_run_tests"
 ]
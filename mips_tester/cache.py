@@ -0,0 +1,58 @@
+"""
+Content addressed cache of test results, so unchanged programs are not re-run through Mars.
+"""
+
+import hashlib
+from pathlib import Path
+
+from .models import MipsState, TestResult
+from .core import config
+
+
+def result_key(
+    filename: Path | str,
+    harness_name: Path | str,
+    expected_state: MipsState,
+    max_steps: int,
+    mars_path: Path | str | None = None,
+) -> str:
+    """Computes the cache key of a final state check.
+
+    Args:
+        filename (Path | str): The MIPS program being tested
+        harness_name (Path | str): The test harness used to run the program
+        expected_state (MipsState): The expected final state being checked
+        max_steps (int): Maximum number of steps the program is simulated for
+        mars_path (Path | str | None, optional): The Mars jar running the program. Defaults to config.mars_path.
+
+    Returns:
+        str: sha256 hex digest of everything that determines the result
+    """
+    digest = hashlib.sha256()
+    for part in (
+        Path(filename).read_bytes(),
+        Path(harness_name).read_bytes(),
+        expected_state.model_dump_json().encode(),
+        str(max_steps).encode(),
+        str(mars_path or config.mars_path).encode(),
+    ):
+        # length prefix each part so adjacent parts cannot run into each other
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def load_result(key: str) -> TestResult | None:
+    """Returns the cached result for a key, or None if it has not been cached."""
+    path = Path(config.cache_dir) / f"{key}.json"
+    try:
+        return TestResult.model_validate_json(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def store_result(key: str, result: TestResult) -> None:
+    """Caches a result under a key."""
+    cache_dir = Path(config.cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / f"{key}.json").write_text(result.model_dump_json())
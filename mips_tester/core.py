@@ -3,7 +3,7 @@ Contains core functionality for the MIPS testing library.
 Includes configuration and shared utils
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from pathlib import Path
 
 
@@ -23,9 +23,25 @@ class MipsConfig(BaseModel):
     default_output_harness: str = Field(
         default="harness.asm", description="Default output filename for test harness"
     )
+    jvm_options: list[str] = Field(
+        default_factory=lambda: ["-XX:TieredStopAtLevel=1", "-XX:+UseSerialGC"],
+        description="Options passed to the JVM before -jar, tuned for fast startup of short runs",
+    )
+    cache_dir: Path | None = Field(
+        default=None,
+        description="Directory to cache final state results in. Caching is disabled when None",
+    )
+    class_archive: Path | None = Field(
+        default=None,
+        description="JVM class data sharing archive of the loaded Mars classes (JDK 19+). Disabled when None",
+    )
+    run_cache_size: int = Field(
+        default=64,
+        ge=0,
+        description="Number of Mars runs kept for reuse within a process, assuming deterministic programs. Disabled when 0",
+    )
 
-    class Config:
-        validate_assignment = True
+    model_config = ConfigDict(validate_assignment=True)
 
 
 # Global config instance:
@@ -33,7 +49,13 @@ config = MipsConfig()
 
 
 def configure(
-    mars_path: str | None = None, max_steps: int | None = None, output_harness: str | None = None
+    mars_path: str | None = None,
+    max_steps: int | None = None,
+    output_harness: str | None = None,
+    jvm_options: list[str] | None = None,
+    cache_dir: str | None = None,
+    class_archive: str | None = None,
+    run_cache_size: int | None = None,
 ) -> None:
     """Updates global config for MIPS tester
 
@@ -41,14 +63,41 @@ def configure(
         mars_path (str | None): Path to Mars JAR file
         max_steps (int | None): Default maximum number of steps to simulate for
         output_harness (str | None): Default harness filename
+        jvm_options (list[str] | None): Options passed to the JVM running Mars
+        cache_dir (str | None): Directory to cache final state results in
+        class_archive (str | None): Path of the JVM class data sharing archive to create and reuse
+        run_cache_size (int | None): Number of Mars runs to keep for reuse (0 to always run Mars)
     """
     global config
 
+    # fields are only assigned when they change, so repeated calls with the same
+    # settings (e.g. in every test's setUp) skip revalidating them:
+    updates = dict()
     if mars_path is not None:
-        config.mars_path = Path(mars_path)
+        updates["mars_path"] = Path(mars_path)
 
     if max_steps is not None:
-        config.default_max_steps = max_steps
+        updates["default_max_steps"] = max_steps
 
     if output_harness is not None:
-        config.default_output_harness = output_harness
+        updates["default_output_harness"] = output_harness
+
+    if jvm_options is not None:
+        updates["jvm_options"] = list(jvm_options)
+
+    if cache_dir is not None:
+        updates["cache_dir"] = Path(cache_dir).expanduser()
+
+    if class_archive is not None:
+        updates["class_archive"] = Path(class_archive).expanduser()
+
+    if run_cache_size is not None:
+        updates["run_cache_size"] = run_cache_size
+
+    for name, value in updates.items():
+        if getattr(config, name) != value:
+            setattr(config, name, value)
+
+    if class_archive is not None:
+        # the JVM creates the archive, but not the directory it goes in
+        config.class_archive.parent.mkdir(parents=True, exist_ok=True)
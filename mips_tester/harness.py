@@ -42,43 +42,44 @@ def create_harness(
     if isinstance(jump_type, str):
         jump_type = JumpType(jump_type)
 
-    # populate harness file with
+    # build harness contents, then write it to the file in one go
+    parts: list[str] = ["# Auto generated test harness\n", ".text\n\n"]
+
+    # initialise memory locations:
+    for addr in initial_state.memory:
+        memory_entry = initial_state.memory[addr]
+        val = memory_entry.value
+        size = memory_entry.size
+
+        parts.append(f"# Storing {val} in the location {addr}:\n")
+        parts.append(f"li $t0, {val}\n")
+        parts.append(f"la $t1, {addr}\n")
+
+        # use appropriate store instruction based on memory entry size:
+        if size == MemorySize.BYTE:
+            parts.append("sb $t0, ($t1)\n\n")
+        elif size == MemorySize.HALFWORD:
+            parts.append("sh $t0, ($t1)\n\n")
+        else:  # WORD (default)
+            parts.append("sw $t0, ($t1)\n\n")
+
+    # initialise register values
+    for reg, val in initial_state.registers.items():
+        if val is not None:
+            parts.append(f"# Storing {val} in register ${reg}:\n")
+            parts.append(f"li ${reg}, {val}\n\n")
+
+    # jump to given label
+    parts.append(f"# Jumping to user code at label {label}:\n")
+    parts.append(f"{jump_type.value} {label}\n\n")
+
+    # if using jal, add infinite loop for return
+    if jump_type == JumpType.JUMP_AND_LINK:
+        parts.append("# Infinite loop:\n")
+        parts.append("endLabel: j endLabel\n")
+
+    # write as bytes to skip the text layer (and newline translation on Windows)
     harness_path = Path(output_harness_name)
-    with harness_path.open("w") as harness_file:
-        harness_file.write("# Auto generated test harness\n")
-        harness_file.write(".text\n\n")
-
-        # initialise memory locations:
-        for addr in initial_state.memory:
-            memory_entry = initial_state.memory[addr]
-            val = memory_entry.value
-            size = memory_entry.size
-
-            harness_file.write(f"# Storing {val} in the location {addr}:\n")
-            harness_file.write(f"li $t0, {val}\n")
-            harness_file.write(f"la $t1, {addr}\n")
-
-            # use appropriate store instruction based on memory entry size:
-            if size == MemorySize.BYTE:
-                harness_file.write("sb $t0, ($t1)\n\n")
-            elif size == MemorySize.HALFWORD:
-                harness_file.write("sh $t0, ($t1)\n\n")
-            else:  # WORD (default)
-                harness_file.write("sw $t0, ($t1)\n\n")
-
-        # initialise register values
-        for reg, val in initial_state.registers.model_dump().items():
-            if val is not None:
-                harness_file.write(f"# Storing {val} in register ${reg}:\n")
-                harness_file.write(f"li ${reg}, {val}\n\n")
-
-        # jump to given label
-        harness_file.write(f"# Jumping to user code at label {label}:\n")
-        harness_file.write(f"{jump_type.value} {label}\n\n")
-
-        # if using jal, add infinite loop for return
-        if jump_type == JumpType.JUMP_AND_LINK:
-            harness_file.write(f"# Infinite loop:\n")
-            harness_file.write("endLabel: j endLabel\n")
+    harness_path.write_bytes("".join(parts).encode())
 
     return harness_path
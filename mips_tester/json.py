@@ -1,49 +1,99 @@
 import json
-from .models import MipsState, JumpType
-from .core import configure, config
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from .models import MipsState, JumpType, TestResult
+from .core import config
 from .harness import create_harness
-from .runner import test_final_state
+from .runner import test_final_states
 
 
-def load_and_run_tests(json_file: str) -> None:
-    """Loads test cases from a JSON file and executes them, printing results to console."""
-    with open(json_file, 'r') as f:
-        test_data = json.load(f)
+def _run_group(
+    mars_path: Path, test_cases: list[dict], harness_name: Path, max_steps: int
+) -> list[TestResult]:
+    # runs test cases sharing the same program and setup with a single run of mars.
+    # groups run on concurrent threads sharing the global config, so the group's mars
+    # jar is passed along rather than set in the config
 
-    for test_case in test_data['tests']:
-        print(f"Running test: {test_case['name']} - {test_case['description']}")
+    # Create initial state
+    initial_state_data = test_cases[0]['initial_state']
+    initial_state = MipsState.from_dict(initial_state_data)
 
-        # Configure Mars path
-        configure(mars_path=test_case['mars_path'])
+    # Create test harness
+    harness_path = create_harness(
+        initial_state=initial_state,
+        label=test_cases[0]['harness']['label'],
+        output_harness_name=harness_name,
+        jump_type=JumpType[test_cases[0]['harness']['jump_type']]
+    )
 
-        # Create initial state
-        initial_state_data = test_case['initial_state']
-        initial_state = MipsState.from_dict(initial_state_data)
+    # Define expected final states
+    expected_states = [
+        MipsState.from_dict(test_case['expected_state']) for test_case in test_cases
+    ]
 
-        # Create test harness
-        harness_path = create_harness(
-            initial_state=initial_state,
-            label=test_case['harness']['label'],
-            jump_type=JumpType[test_case['harness']['jump_type']]
-        )
+    # Test the program
+    return test_final_states(
+        expected_states=expected_states,
+        harness_name=harness_path,
+        filename=test_cases[0]['program_file'],
+        max_steps=max_steps,
+        mars_path=mars_path,
+    )
+
+
+def load_and_run_tests(json_file: str, max_workers: int | None = None) -> None:
+    """Loads test cases from a JSON file and executes them, printing results to console.
 
-        # Define expected final state
-        expected_state_data = test_case['expected_state']
-        expected_state = MipsState.from_dict(expected_state_data)
-        try:
-            max_steps = test_case['max_steps']
-        except:
-            max_steps = config.default_max_steps
-
-        # Test the program
-        result = test_final_state(
-            expected_state=expected_state,
-            harness_name=harness_path,
-            filename=test_case['program_file'],
-            max_steps=max_steps
+    Test cases that run the same program from the same initial state (same Mars path, harness
+    and max steps) only differ in their expected state, so they share a single run of Mars.
+    Independent runs are spread across worker threads, each waiting on its own Mars JVM.
+
+    Args:
+        json_file (str): Path to the JSON file of test cases
+        max_workers (int | None, optional): Number of worker threads. Defaults to the number of CPUs.
+    """
+    with open(json_file, 'r') as f:
+        test_data = json.load(f)
+
+    # group test cases that would produce identical Mars runs:
+    groups = dict()
+    for index, test_case in enumerate(test_data['tests']):
+        key = (
+            test_case['mars_path'],
+            test_case['program_file'],
+            json.dumps(test_case['initial_state'], sort_keys=True),
+            test_case['harness']['label'],
+            test_case['harness']['jump_type'],
+            test_case.get('max_steps', config.default_max_steps),
         )
+        groups.setdefault(key, []).append(index)
 
-        # Check the result
+    results = dict()
+    # each group gets its own harness file, so workers never overwrite each other's
+    with TemporaryDirectory() as harness_dir, ThreadPoolExecutor(
+        max_workers or os.cpu_count()
+    ) as executor:
+        futures = dict()
+        for group_index, (key, indices) in enumerate(groups.items()):
+            mars_path, max_steps = key[0], key[-1]
+            futures[executor.submit(
+                _run_group,
+                Path(mars_path),
+                [test_data['tests'][index] for index in indices],
+                Path(harness_dir) / f"harness_{group_index}.asm",
+                max_steps,
+            )] = indices
+
+        for future, indices in futures.items():
+            results.update(zip(indices, future.result()))
+
+    # Check the results, in the order the tests were defined
+    for index, test_case in enumerate(test_data['tests']):
+        result = results[index]
+        print(f"Running test: {test_case['name']} - {test_case['description']}")
         print(f"Test {'passed' if result.score == 1 else 'failed'}")
         if result.messages:
             for msg in result.messages:
@@ -3,6 +3,7 @@ Defined data models for MIPS testing library
 """
 
 from enum import Enum
+from functools import lru_cache
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 
 
@@ -28,6 +29,7 @@ class MemoryEntry(BaseModel):
     size: MemorySize = MemorySize.WORD
 
     @field_validator("value")
+    @classmethod
     def validate_value(cls, v):
         val_str = str(v)
         # ensure decimal or hex:
@@ -71,9 +73,30 @@ class RegisterState(BaseModel):
     fp: str | None = None
     ra: str | None = None
 
+    def items(self):
+        """Yields (register name, value) pairs without building a dict like model_dump()."""
+        for reg in REGISTER_NAMES:
+            yield reg, getattr(self, reg)
+
+    def set_items(self) -> list[tuple[str, str]]:
+        """Returns the (register name, value) pairs of registers that have a value."""
+        return [(reg, val) for reg, val in self.items() if val is not None]
+
     model_config = ConfigDict(validate_assignment=True)
 
 
+@lru_cache(maxsize=4096)
+def _parse_address(addr_str: str) -> tuple[int, str]:
+    # parses a decimal/hex address into its integer and canonical 0x%08x form.
+    # cached since the same addresses are validated repeatedly across states
+    addr_int = int(addr_str, 0)
+    return addr_int, f"0x{addr_int:08x}"
+
+
+# register names in declaration order, for iterating registers without model_dump():
+REGISTER_NAMES = tuple(RegisterState.model_fields)
+
+
 class MipsState(BaseModel):
     """Represents the complete state of a MIPS program (registers+memory)."""
 
@@ -84,6 +107,7 @@ class MipsState(BaseModel):
     )
 
     @field_validator("memory")
+    @classmethod
     def validate_memory_addresses(cls, v):
         memory = dict()
         for addr, entry in v.items():
@@ -104,7 +128,7 @@ class MipsState(BaseModel):
 
             # ensure address is number (decimal or hex):
             try:
-                addr_int = int(addr_str, 0)
+                addr_int, addr_padded = _parse_address(addr_str)
 
                 # ensure memory address is aligned with word or half word boundaries:
                 if memory_entry.size == MemorySize.HALFWORD and addr_int % 2 != 0:
@@ -113,8 +137,6 @@ class MipsState(BaseModel):
                     )
                 elif memory_entry.size == MemorySize.WORD and addr_int % 4 != 0:
                     raise ValueError(f"Word address {addr_str} must be 4-byte aligned")
-
-                addr_padded = f"0x{addr_int:08x}"
             except ValueError:
                 raise ValueError(
                     f"Invalid memory address: {addr_str}! Must be decimal or hex"
@@ -130,14 +152,17 @@ class MipsState(BaseModel):
         if "memory" in data and isinstance(data["memory"], dict):
             memory_dict = dict()
             for addr, value in data["memory"].items():
-                if isinstance(value, dict) and "value" in value:
+                if isinstance(value, MemoryEntry) or (
+                    isinstance(value, dict) and "value" in value
+                ):
                     # already in new format:
                     memory_dict[addr] = value
                 else:
                     # uses old format, so convert to new format
                     # with default as WORD size
                     memory_dict[addr] = {"value": str(value), "size": MemorySize.WORD}
-            data["memory"] = memory_dict
+            # copy rather than modify the caller's dict:
+            data = {**data, "memory": memory_dict}
         return cls(**data)
 
     model_config = ConfigDict(validate_assignment=True)
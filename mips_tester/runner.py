@@ -2,24 +2,209 @@
 Functions to assemble, run and check final state of MIPS programs
 """
 
+import hashlib
+import os
+import re
+import signal
 import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 from .models import MipsState, TestResult, MemorySize
 from .core import config
+from . import cache
+
+# exit codes mars is asked to use when assembly/simulation fails:
+_ASSEMBLE_ERROR_CODE = 2
+_RUNTIME_ERROR_CODE = 3
+# exit code reported when mars is killed for running past its time limit:
+_TIMEOUT_CODE = 124
+# exit code reported when java itself cannot be started (as a shell would report it):
+_LAUNCH_ERROR_CODE = 127
+
+# wall-clock limit on a mars run: enough for JVM startup on a loaded machine,
+# plus a generous allowance per simulated step
+_MIN_TIMEOUT = 30.0
+_TIMEOUT_PER_STEP = 1e-5
+
+# a memory word or register value printed by mars after the program finishes:
+_OUTPUT_VALUE = re.compile(
+    r"^[ \t]*(?:Mem\[(0x[0-9a-fA-F]+)\]|\$(\w+))[ \t]+(0x[0-9a-fA-F]+)", re.MULTILINE
+)
+
+# results of assembles, keyed by _assemble_key. failures are only kept in memory,
+# while successes are also cached on disk when config.cache_dir is set:
+_assemble_cache: dict[str, TestResult] = {}
+
+_ASSEMBLE_FAILURE = TestResult(
+    success=False, score=0.0, messages=["Program did not assemble correctly"]
+)
+
+# completed mars runs, keyed by _run_key and least recently used first. at most
+# config.run_cache_size are kept, and the lock guards them across the threads of
+# test_final_state_batch:
+_run_cache: OrderedDict[tuple, subprocess.CompletedProcess] = OrderedDict()
+_run_cache_lock = threading.Lock()
+
+
+def _mars_command(mars_path: Path | str | None = None) -> list[str]:
+    # the argv prefix used to launch mars (the configured jar unless given another)
+    # with the configured jvm options. config can be changed at any time, so the
+    # prefix is cached by the settings it is built from
+    return list(
+        _mars_prefix(
+            Path(mars_path or config.mars_path),
+            tuple(config.jvm_options),
+            config.class_archive,
+        )
+    )
+
+
+@lru_cache(maxsize=16)
+def _mars_prefix(
+    mars_path: Path, jvm_options: tuple[str, ...], class_archive: Path | None
+) -> tuple[str, ...]:
+    command = ["java", *jvm_options]
+    if class_archive is not None:
+        # the first run dumps the classes mars loaded into the archive, later runs
+        # map them straight in instead of loading and verifying them again.
+        # cds logging is silenced as it would be mixed into mars' output
+        command.extend(
+            [
+                "-XX:+AutoCreateSharedArchive",
+                f"-XX:SharedArchiveFile={class_archive}",
+                "-Xlog:cds*=off",
+            ]
+        )
+    command.extend(["-jar", str(mars_path)])
+    return tuple(command)
+
+
+def _timeout(max_steps: int = 0) -> float:
+    # the wall-clock limit in seconds for a mars run of up to max_steps steps
+    return max(_MIN_TIMEOUT, max_steps * _TIMEOUT_PER_STEP)
+
+
+def _run_mars(command: list[str], timeout: float) -> subprocess.CompletedProcess:
+    # runs mars without a shell. stderr is merged into stdout so java launch errors
+    # are reported in the output like mars' own errors. stdin is closed so programs
+    # reading input fail instead of blocking, and a run past the timeout is killed
+    # (along with its process group) and reported with _TIMEOUT_CODE. java failing to
+    # start at all is reported with _LAUNCH_ERROR_CODE and the error as output
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            start_new_session=True,
+        )
+    except OSError as e:
+        return subprocess.CompletedProcess(command, _LAUNCH_ERROR_CODE, f"{e}\n")
+    with process:
+        try:
+            stdout, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            stdout, _ = process.communicate()
+            return subprocess.CompletedProcess(command, _TIMEOUT_CODE, stdout)
+    return subprocess.CompletedProcess(command, process.returncode, stdout)
+
+
+def _launch_failure(result: subprocess.CompletedProcess) -> TestResult:
+    # the result of a check whose mars run could not be started
+    return TestResult(
+        success=False,
+        score=0.0,
+        messages=[f"Mars could not be launched: {result.stdout.strip()}"],
+    )
+
+
+def _run_key(command: list[str], sources: list[Path | str]) -> tuple:
+    # identifies a run by its command, with each source path swapped for a digest of
+    # the file's contents. identical sources in different places share a run, and
+    # editing a source runs it again
+    digests = {
+        os.fspath(source): hashlib.blake2b(Path(source).read_bytes()).digest()
+        for source in sources
+    }
+    return tuple(digests.get(arg, arg) for arg in command)
+
+
+def _run_mars_cached(
+    command: list[str], sources: list[Path | str], timeout: float
+) -> subprocess.CompletedProcess:
+    # runs mars like _run_mars, reusing the result of an identical earlier run. this
+    # assumes programs are deterministic (no time or random syscalls), which is why
+    # config.run_cache_size can turn it off. only runs that finished with a known
+    # outcome are kept: timeouts and launch failures may not happen again
+    if config.run_cache_size == 0:
+        return _run_mars(command, timeout)
+
+    key = _run_key(command, sources)
+    with _run_cache_lock:
+        result = _run_cache.get(key)
+        if result is not None:
+            _run_cache.move_to_end(key)
+            return result
+
+    result = _run_mars(command, timeout)
+    if result.returncode in (0, _ASSEMBLE_ERROR_CODE, _RUNTIME_ERROR_CODE):
+        with _run_cache_lock:
+            _run_cache[key] = result
+            while len(_run_cache) > config.run_cache_size:
+                _run_cache.popitem(last=False)
+    return result
+
+
+def clear_run_cache() -> None:
+    """Forgets the Mars runs kept for reuse, so later checks run their programs again."""
+    with _run_cache_lock:
+        _run_cache.clear()
+
 
 def _check_exists(filename: Path | str, harness_name: Path | str = None) -> None | TestResult:
     # checks whether the file name and harness exist
-    filename = Path(filename)
-    if not Path.exists(filename):
+    filename = os.fspath(filename)
+    if not os.path.exists(filename):
         return TestResult(success=False, score=0.0, messages=[f"File {filename} was not found."])
-    
+
     if harness_name:
-        harness_name = Path(harness_name)
-        if not Path.exists(harness_name):
+        harness_name = os.fspath(harness_name)
+        if not os.path.exists(harness_name):
             return TestResult(success=False, score=0.0, messages=[f"Harness {harness_name} was not found."])
     return None
 
+
+def _program_name(filename: Path | str, harness_name: Path | str | None) -> str:
+    # the harness and program as named in verbose output
+    if harness_name:
+        return f"{os.fspath(harness_name)} {os.fspath(filename)}"
+    return os.fspath(filename)
+
+
+def _assemble_key(filename: Path | str, harness_name: Path | str | None) -> str:
+    # identifies an assemble by the mars jar and the contents of each source, so
+    # identical sources share an assemble wherever they are and editing one invalidates it
+    digest = hashlib.blake2b(str(config.mars_path).encode())
+    for path in (harness_name, filename):
+        if path:
+            # length prefixed, so the harness and program cannot run into each other
+            content = Path(path).read_bytes()
+            digest.update(len(content).to_bytes(8, "little"))
+            digest.update(content)
+    return digest.hexdigest()
+
+
 def test_assemble(
     filename: Path | str, harness_name: Path | str | None = None, verbose: bool = False
 ) -> TestResult:
@@ -33,38 +218,69 @@ def test_assemble(
     Returns:
         TestResult: Contains success status proportion of passed tests, and corresponding messages.
     """
-    # check file name and path exists:
-    file_exists_result = _check_exists(filename, harness_name)
-    if file_exists_result is not None:
-        return file_exists_result
-    
-    command = ["java", "-jar", str(config.mars_path)]
+    # check file name and path exists. reading the sources for the cache key doubles as
+    # the existence check, so _check_exists only runs to report which file is missing:
+    try:
+        key = _assemble_key(filename, harness_name)
+    except FileNotFoundError:
+        return _check_exists(filename, harness_name) or TestResult(
+            success=False, score=0.0, messages=[f"File {filename} was not found."]
+        )
 
-    if harness_name is not None:
-        command.append(f"{harness_name}")
+    # skip mars when the same sources have already been assembled in this process, or
+    # assembled successfully in an earlier one (when caching results on disk):
+    cached = _assemble_cache.get(key)
+    if cached is None and config.cache_dir is not None:
+        cached = cache.load_result(key)
+        if cached is not None:
+            _assemble_cache[key] = cached
+    if cached is not None:
+        if verbose:
+            outcome = "assembled" if cached.success else "did not assemble"
+            print(f"Program {_program_name(filename, harness_name)} {outcome} correctly!")
+        return cached.model_copy(deep=True)
+
+    command = _mars_command()
+
+    if harness_name:
+        command.append(str(harness_name))
 
     command.extend(
-        [f"{filename}", "nc", "a"]
+        [str(filename), "nc", "a"]
     )  # a -> assemble only, nc -> no copyright message
 
-    result = subprocess.getstatusoutput(
-        " ".join(command)
-    )  # todo: replace with subprocess.run
+    result = _run_mars(command, _timeout())
 
-    if result[1] == "":
+    if result.returncode == _TIMEOUT_CODE:
+        if verbose:
+            print(
+                f"Program {_program_name(filename, harness_name)} timed out while assembling!"
+            )
+        return TestResult(
+            success=False,
+            score=0.0,
+            messages=[f"Program did not assemble within {_timeout():.0f}s"],
+        )
+    elif result.returncode == _LAUNCH_ERROR_CODE:
+        return _launch_failure(result)
+    elif result.stdout.strip() == "":
         if verbose:
             print(
-                f"Program {' '.join([harness_name, filename] if harness_name else [filename])} assembled correctly!"
+                f"Program {_program_name(filename, harness_name)} assembled correctly!"
             )
+        _assemble_cache[key] = TestResult(success=True, score=1.0)
+        if config.cache_dir is not None:
+            cache.store_result(key, _assemble_cache[key])
         return TestResult(success=True, score=1.0)
     else:
         if verbose:
             print(
-                f"Program {' '.join([harness_name, filename] if harness_name else [filename])} did not assemble correctly!"
+                f"Program {_program_name(filename, harness_name)} did not assemble correctly!"
             )
-        return TestResult(
-            success=False, score=0.0, messages=["Program did not assemble correctly"]
-        )
+        if result.returncode == 0:
+            # mars ran and reported assembly errors (rather than failing to launch)
+            _assemble_cache[key] = _ASSEMBLE_FAILURE
+        return _ASSEMBLE_FAILURE.model_copy(deep=True)
 
 
 def test_run(
@@ -77,39 +293,92 @@ def test_run(
     file_exists_result = _check_exists(filename, harness_name)
     if file_exists_result is not None:
         return file_exists_result
-    
+
+    # sources already known not to assemble are not run again:
+    key = _assemble_key(filename, harness_name)
+    cached = _assemble_cache.get(key)
+    if cached is not None and not cached.success:
+        if verbose:
+            print(
+                f"Program {_program_name(filename, harness_name)} did not assemble correctly!"
+            )
+        return cached.model_copy(deep=True)
 
     # revert to defaults if max_steps not specified:
     if max_steps is None:
         max_steps = config.default_max_steps
 
-    command = ["java", "-jar", str(config.mars_path)]
+    command = _mars_command()
 
     # include harness if specified
-    if harness_name is not None:
-        command.append(f"{str(harness_name)}")
+    if harness_name:
+        command.append(str(harness_name))
 
-    command.extend([f"{filename}", str(max_steps), "nc", "se1", "ae1"])
+    command.extend(
+        [
+            str(filename),
+            str(max_steps),
+            "nc",
+            f"se{_RUNTIME_ERROR_CODE}",
+            f"ae{_ASSEMBLE_ERROR_CODE}",
+        ]
+    )
 
     # run program:
-    result = subprocess.getstatusoutput(" ".join(command))
+    sources = [harness_name, filename] if harness_name else [filename]
+    result = _run_mars_cached(command, sources, _timeout(max_steps))
 
-    if result[0] == 0:
+    # a run also tells whether the sources assemble, which later assembles reuse:
+    if result.returncode in (0, _RUNTIME_ERROR_CODE):
+        _assemble_cache.setdefault(key, TestResult(success=True, score=1.0))
+    elif result.returncode == _ASSEMBLE_ERROR_CODE:
+        _assemble_cache[key] = _ASSEMBLE_FAILURE
+
+    if result.returncode == 0:
         if verbose:
             print(
-                f"Program {' '.join([harness_name, filename] if harness_name else [filename])} did not have runtime errors!"
+                f"Program {_program_name(filename, harness_name)} did not have runtime errors!"
             )
         return TestResult(success=True, score=1.0)
-    else:
+    elif result.returncode == _RUNTIME_ERROR_CODE:
         if verbose:
             print(
-                f"Program {' '.join([harness_name, filename] if harness_name else [filename])} had runtime error(s)!"
+                f"Program {_program_name(filename, harness_name)} had runtime error(s)!"
             )
         return TestResult(
             success=False,
             score=0.0,
             messages=["Program execution resulted in runtime errors"],
         )
+    elif result.returncode == _TIMEOUT_CODE:
+        if verbose:
+            print(
+                f"Program {_program_name(filename, harness_name)} timed out!"
+            )
+        return TestResult(
+            success=False,
+            score=0.0,
+            messages=[f"Program execution did not finish within {_timeout(max_steps):.0f}s"],
+        )
+    elif result.returncode == _LAUNCH_ERROR_CODE:
+        return _launch_failure(result)
+    else:
+        # the program never ran, because it (or its harness) failed to assemble
+        if verbose:
+            print(
+                f"Program {_program_name(filename, harness_name)} did not assemble correctly!"
+            )
+        return _ASSEMBLE_FAILURE.model_copy(deep=True)
+
+
+# (value mask, mask of the address bits giving the value's byte offset in its word)
+# per size, so values are extracted with the same shift-and-mask for every size.
+# words are masked with -1, which keeps every bit like the full word is returned:
+_SIZE_INFO = {
+    MemorySize.BYTE: (0xFF, 0b11),
+    MemorySize.HALFWORD: (0xFFFF, 0b10),
+    MemorySize.WORD: (-1, 0b00),
+}
 
 
 def extract_memory_value(word_value: int, addr: int, size: MemorySize) -> int:
@@ -123,172 +392,341 @@ def extract_memory_value(word_value: int, addr: int, size: MemorySize) -> int:
     Returns:
         int: The extracted value based on size and alignment
     """
-    byte_offset = addr % 4
+    mask, offset_mask = _SIZE_INFO[size]
+    return (word_value >> ((addr & offset_mask) * 8)) & mask
+
+
+def _parse_int(value: str) -> int:
+    # parses a decimal or hex value like int(value, 0), skipping base detection for
+    # the plain hex and decimal forms that make up nearly all expected values.
+    # anything else (signs, 0b/0o, leading zeros, whitespace) takes the general path
+    if value[:2] in ("0x", "0X"):
+        return int(value, 16)
+    if value.isdecimal() and (value[0] != "0" or len(value) == 1):
+        return int(value)
+    return int(value, 0)
+
+
+def _value_slice(addr: int, size: MemorySize) -> tuple[int, int]:
+    # the shift and mask that extract a value of the given size at addr from its word
+    mask, offset_mask = _SIZE_INFO[size]
+    return (addr & offset_mask) * 8, mask
+
+
+@dataclass(frozen=True)
+class CompiledSpec:
+    """An expected final state with its Mars check targets and expected values resolved
+    up front, so it can be checked against many programs without redoing that work.
+    Created with compile_expected().
+    """
 
-    if size == MemorySize.BYTE:
-        shamt = byte_offset * 8
-        return (word_value >> shamt) & 0xFF
-    elif size == MemorySize.HALFWORD:
-        shamt = (byte_offset & ~1) * 8
-        return (word_value >> shamt) & 0xFFFF
-    else:  # WORD (default)
-        return word_value
+    expected_state: MipsState
+    # word-aligned addresses of the memory entries:
+    words: frozenset[int]
+    # names of the registers with an expected value, in declaration order:
+    registers: tuple[str, ...]
+    # the memory and register arguments passed to mars:
+    check_targets: tuple[str, ...]
+    # (addr, word address, shift, mask, size, masked expected value) per memory entry:
+    memory: tuple[tuple[str, int, int, int, MemorySize, int], ...]
+    # (register, expected value as given, expected value) per register:
+    register_values: tuple[tuple[str, str, int], ...]
+
+
+def compile_expected(expected_state: MipsState | dict) -> CompiledSpec:
+    """Resolves the Mars check targets and expected values of an expected final state once.
+
+    Args:
+        expected_state (MipsState | dict): The expected final state to compile
+
+    Returns:
+        CompiledSpec: Compiled expected state, accepted wherever an expected state is.
+    """
+    if isinstance(expected_state, dict):
+        expected_state = MipsState.from_dict(expected_state)
+
+    # parse expected values, masking non-words to ensure proper comparison. the word
+    # holding each value and the shift/mask that extract it are also resolved here,
+    # so scoring is the same shift-and-mask for every size:
+    memory = []
+    words = set()
+    for addr, entry in expected_state.memory.items():
+        expected_value = _parse_int(entry.value)
+        if entry.size == MemorySize.BYTE:
+            expected_value &= 0xFF
+        elif entry.size == MemorySize.HALFWORD:
+            expected_value &= 0xFFFF
+        # addresses are normalised to 0x%08x by MipsState, so are always hex:
+        addr_int = int(addr, 16)
+        word_addr = addr_int & ~0x3  # clear bottom 2 bits to word align
+        words.add(word_addr)
+        shamt, mask = _value_slice(addr_int, entry.size)
+        memory.append((addr, word_addr, shamt, mask, entry.size, expected_value))
+
+    register_values = tuple(
+        (reg, expected_value, _parse_int(expected_value))
+        for reg, expected_value in expected_state.registers.set_items()
+    )
+
+    words = frozenset(words)
+    registers = tuple(reg for reg, _, _ in register_values)
+    return CompiledSpec(
+        expected_state=expected_state,
+        words=words,
+        registers=registers,
+        check_targets=_check_targets(words, registers),
+        memory=tuple(memory),
+        register_values=register_values,
+    )
+
+
+def _check_targets(words: frozenset[int], registers: tuple[str, ...]) -> tuple[str, ...]:
+    # mars arguments that dump each memory word (in address order) and register
+    return (
+        *(f"0x{word_addr:08x}-0x{word_addr:08x}" for word_addr in sorted(words)),
+        *registers,
+    )
 
 
 def test_final_state(
-    expected_state: MipsState | dict,
+    expected_state: MipsState | dict | CompiledSpec,
     harness_name: Path | str,
     filename: Path | str,
     verbose: bool = False,
     max_steps: int | None = None,
 ) -> TestResult:
+    return test_final_states([expected_state], harness_name, filename, verbose, max_steps)[0]
+
+
+def test_final_states(
+    expected_states: list[MipsState | dict | CompiledSpec],
+    harness_name: Path | str,
+    filename: Path | str,
+    verbose: bool = False,
+    max_steps: int | None = None,
+    mars_path: Path | str | None = None,
+) -> list[TestResult]:
+    """Checks the final state of a MIPS program against several expected states, using a
+        single run of the program.
+
+    Args:
+        expected_states (list[MipsState | dict | CompiledSpec]): The expected final states to check against
+        harness_name (Path | str): Test harness to setup register/memory values
+        filename (Path | str): The MIPS program to test
+        verbose (bool, optional): Flag to print informative feedback. Defaults to False.
+        max_steps (int | None, optional): Maximum number of steps to simulate for. Defaults to config.default_max_steps.
+        mars_path (Path | str | None, optional): Mars jar to run the program with. Defaults to config.mars_path.
+
+    Returns:
+        list[TestResult]: One result per expected state, in the same order.
+    """
     # check file name and path exists:
     file_exists_result = _check_exists(filename, harness_name)
     if file_exists_result is not None:
-        return file_exists_result
-    
+        return [file_exists_result.model_copy() for _ in expected_states]
 
-    # convert expected_state to MipsState if not already:
-    if isinstance(expected_state, dict):
-        expected_state = MipsState.from_dict(expected_state)
+    # compile expected states if not already:
+    specs = [
+        state if isinstance(state, CompiledSpec) else compile_expected(state)
+        for state in expected_states
+    ]
 
     # revert to defaults if max_steps not specified:
     if max_steps is None:
         max_steps = config.default_max_steps
 
-    # check the program assembles first:
-    assembly_test = test_assemble(filename, harness_name, False)
-    if not assembly_test.success:
-        return TestResult(
-            success=False,
-            score=0.0,
-            messages=[f"{filename} did not assemble correctly"],
+    if config.cache_dir is None:
+        return _run_final_states(
+            specs, harness_name, filename, verbose, max_steps, mars_path
         )
 
-    # check the program runs:
-    run_test = test_run(filename, harness_name, False, max_steps)
-    if not run_test.success:
-        return TestResult(
-            success=False,
-            score=0.0,
-            messages=[f"{filename} did not run correctly"],
+    # reuse the results of identical earlier checks, only running mars for the rest:
+    keys = [
+        cache.result_key(
+            filename, harness_name, spec.expected_state, max_steps, mars_path
         )
+        for spec in specs
+    ]
+    results = [cache.load_result(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
 
-    # prepare command to check both memory and registers
-    check_targets = []
+    if not missing:
+        if verbose:
+            print(f"Using cached results for {filename}")
+        return results
+
+    fresh_results = _run_final_states(
+        [specs[i] for i in missing], harness_name, filename, verbose, max_steps, mars_path
+    )
+    for i, result in zip(missing, fresh_results):
+        results[i] = result
+        # failures may come from the environment (e.g. java missing), so are not cached
+        if result.success:
+            cache.store_result(keys[i], result)
+    return results
+
+
+def test_final_state_batch(
+    cases: list[tuple[MipsState | dict | CompiledSpec, Path | str, Path | str]],
+    verbose: bool = False,
+    max_steps: int | None = None,
+    max_workers: int | None = None,
+) -> list[TestResult]:
+    """Checks the final state of many MIPS programs concurrently.
 
-    # Add word-aligned memory addresses for MARS to check
-    word_aligned_addresses = set()
-    for addr_str in expected_state.memory:
-        # Get the word-aligned address containing our target address
-        addr_int = int(addr_str, 0)
-        word_addr = addr_int & ~0x3  # Mask off bottom 2 bits to get word alignment
-        word_aligned_addresses.add(f"0x{word_addr:08x}")
+    Args:
+        cases (list[tuple[MipsState | dict | CompiledSpec, Path | str, Path | str]]): (expected_state, harness_name, filename) for each program to check
+        verbose (bool, optional): Flag to print informative feedback. Defaults to False.
+        max_steps (int | None, optional): Maximum number of steps to simulate for. Defaults to config.default_max_steps.
+        max_workers (int | None, optional): Maximum number of programs to run at once. Defaults to the number of CPUs.
 
-    # Add the word-aligned addresses to check targets
-    for addr in word_aligned_addresses:
-        check_targets.append(f"{addr}-{addr}")
+    Returns:
+        list[TestResult]: One result per case, in the same order.
+    """
+    # each check spends its time waiting on its own mars process, so threads are
+    # enough to overlap them and share the current config
+    with ThreadPoolExecutor(max_workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(
+                test_final_state, expected_state, harness_name, filename, verbose, max_steps
+            )
+            for expected_state, harness_name, filename in cases
+        ]
+        return [future.result() for future in futures]
 
-    # add register names:
-    for reg, expected_value in expected_state.registers.model_dump().items():
-        if expected_value is not None:
-            check_targets.append(f"{reg}")
 
-    # construct command:
+def _run_final_states(
+    specs: list[CompiledSpec],
+    harness_name: Path | str,
+    filename: Path | str,
+    verbose: bool,
+    max_steps: int,
+    mars_path: Path | str | None = None,
+) -> list[TestResult]:
+    # runs mars once and scores each expected state against its output
+
+    # check both memory and registers of every expected state. a single state's
+    # targets are precompiled, otherwise words and registers are merged (once each):
+    if len(specs) == 1:
+        check_targets = specs[0].check_targets
+    else:
+        words = frozenset().union(*(spec.words for spec in specs))
+        registers = dict()
+        for spec in specs:
+            registers.update(dict.fromkeys(spec.registers))
+        check_targets = _check_targets(words, tuple(registers))
+
+    # construct command. assembly and runtime errors exit with distinct codes
+    # so a single mars invocation can assemble, run and report the final state:
     command = [
-        "java",
-        "-jar",
-        str(config.mars_path),
+        *_mars_command(mars_path),
         str(harness_name),
         str(filename),
         str(max_steps),
-        "se1",
+        f"ae{_ASSEMBLE_ERROR_CODE}",
+        f"se{_RUNTIME_ERROR_CODE}",
         "nc",
         *check_targets,
     ]
 
-    result = subprocess.getstatusoutput(" ".join(command))
+    timeout = _timeout(max_steps)
+    result = _run_mars_cached(command, [harness_name, filename], timeout)
+
+    if result.returncode != 0:
+        # every state fails the same way, so the message is only formatted once
+        if result.returncode == _RUNTIME_ERROR_CODE:
+            message = f"{filename} did not run correctly"
+        elif result.returncode == _TIMEOUT_CODE:
+            message = f"{filename} did not run correctly (timed out after {timeout:.0f}s)"
+        elif result.returncode == _LAUNCH_ERROR_CODE:
+            message = _launch_failure(result).messages[0]
+        else:
+            message = f"{filename} did not assemble correctly"
+        return [TestResult(success=False, score=0.0, messages=[message]) for _ in specs]
+
+    # parse memory ("Mem[0x...] value") and register ("$reg value") lines with one
+    # precompiled pattern over the whole output, without splitting it into lines first:
+    actual_memory = {}
+    actual_registers = {}
+    for match in _OUTPUT_VALUE.finditer(result.stdout):
+        addr, reg, value = match.groups()
+        if addr is not None:
+            actual_memory[int(addr, 16)] = int(value, 16)
+        else:
+            # mars prints each register under the name it was asked for
+            actual_registers[reg] = int(value, 16)
+
+    return [
+        _score_final_state(spec, actual_memory, actual_registers, verbose)
+        for spec in specs
+    ]
+
 
-    output_lines = result[1].split("\n")
+def _write_log(lines: list[str]) -> None:
+    # writes verbose lines to stdout with a single write
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
 
-    # parse the output:
+
+def _score_final_state(
+    spec: CompiledSpec,
+    actual_memory: dict[int, int],
+    actual_registers: dict[str, int],
+    verbose: bool,
+) -> TestResult:
+    # compares a compiled expected state against the parsed output of a mars run
     total_marks = 0
     available_marks = 0
     messages = []
-
-    # Store actual memory values for later processing
-    actual_memory = {}
-    for line in output_lines:
-        if "Mem[0x" in line:
-            parts = line.split()
-            addr = parts[0].replace("Mem[", "").replace("]", "")
-            value = parts[-1]
-            actual_memory[addr] = int(value, 16)
+    # verbose lines are collected and written in one go, so the output of states
+    # checked concurrently is not interleaved line by line:
+    log = []
 
     # check memory locations:
-    for addr in expected_state.memory:
+    for addr, word_addr, shamt, mask, size, expected_value in spec.memory:
         available_marks += 1
 
-        entry = expected_state.memory[addr]
-        addr_int = int(addr, 0)
-
-        # find the word-aligned address containing the target address:
-        word_addr_int = addr_int & ~0x3  # set bottom 2 bits to 0 to make word aligned
-        word_addr_hex = f"0x{word_addr_int:08x}"
-
-        if word_addr_hex not in actual_memory:
-            messages.append(f"Memory location {word_addr_hex} not found in output")
+        word_value = actual_memory.get(word_addr)
+        if word_value is None:
+            message = f"Memory location 0x{word_addr:08x} not found in output"
+            messages.append(message)
             if verbose:
-                print(f"Memory location {word_addr_hex} not found in output")
+                log.append(message)
             continue
 
-        # get full word value from memory:
-        word_value = actual_memory[word_addr_hex]
-
-        # get correct portion of value based on memory entry size:
-        actual_value = extract_memory_value(word_value, addr_int, entry.size)
-        expected_value = int(entry.value, 0)
-
-        # mask non-words to ensure proper comparison (not strictly necessary):
-        if entry.size == MemorySize.BYTE:
-            expected_value &= 0xFF
-        elif entry.size == MemorySize.HALFWORD:
-            expected_value &= 0xFFFF
+        # get correct portion of the full word based on memory entry size:
+        actual_value = (word_value >> shamt) & mask
 
         if actual_value == expected_value:
             total_marks += 1
             if verbose:
-                print(f"Correct {entry.size.value} value at {addr}")
+                log.append(f"Correct {size.value} value at {addr}")
         else:
-            message = f"Incorrect {entry.size.value} value at {addr}! Expected: {hex(expected_value)} Actual: {hex(actual_value)}"
+            message = f"Incorrect {size.value} value at {addr}! Expected: {hex(expected_value)} Actual: {hex(actual_value)}"
             messages.append(message)
             if verbose:
-                print(message)
+                log.append(message)
 
     # check register values
-    for reg, expected_value in expected_state.registers.model_dump().items():
-        if expected_value is None:
-            continue
+    for reg, expected_value, expected_int in spec.register_values:
         available_marks += 1
 
-        target_reg_line = next(
-            (line for line in output_lines if f"${reg}" in line), None
-        )
+        actual_value = actual_registers.get(reg)
 
-        if not target_reg_line:
+        if actual_value is None:
+            _write_log(log)
             raise ValueError(f"${reg} not found in output, critical error occurred")
 
-        actual_value = target_reg_line.split()[-1]
-
-        if int(actual_value, base=16) == int(expected_value, base=0):
+        if actual_value == expected_int:
             total_marks += 1
             if verbose:
-                print(f"Correct value in ${reg}")
+                log.append(f"Correct value in ${reg}")
         else:
-            message = f"Incorrect value in ${reg}! Expected: {expected_value} Actual: {actual_value}"
+            message = f"Incorrect value in ${reg}! Expected: {expected_value} Actual: 0x{actual_value:08x}"
             messages.append(message)
             if verbose:
-                print(message)
+                log.append(message)
 
+    _write_log(log)
     score = total_marks / available_marks if available_marks > 0 else 1.0
     return TestResult(success=True, score=score, messages=messages)
@@ -0,0 +1,126 @@
+"""
+Runs the test suite with tests spread across worker processes:
+
+    python -m tests [-j WORKERS]
+
+Nearly all test time is spent waiting on Mars JVMs, so test classes overlap well. Each
+test class is run as a whole by one worker process, so its setUpModule and setUpClass
+run once per class rather than once per test. Each worker has its own config and scratch
+directories (including the default harness path), so concurrent classes never share
+files or settings.
+"""
+
+import argparse
+import os
+import sys
+import unittest
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+_FAILED = ("ERROR", "FAIL", "unexpected success")
+
+# tests are started cheapest first (by name prefix), so a broken environment is
+# found by an assemble before any longer run is started:
+_COST_ORDER = ("test_assemble", "test_run", "test_create_harness")
+
+
+def _iter_tests(suite: unittest.TestSuite):
+    # flattens a (nested) suite into its individual test cases
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_tests(test)
+        else:
+            yield test
+
+
+def _outcomes(test_ids: list[str], result: unittest.TestResult) -> list[tuple[str, str, str]]:
+    # the (test id, outcome, details) of each test run into result. errors in module or
+    # class fixtures are reported under their own ids
+    problems = dict()
+    for outcome, entries in (
+        ("ERROR", result.errors),
+        ("FAIL", result.failures),
+        ("unexpected success", [(case, "") for case in result.unexpectedSuccesses]),
+        ("skipped", result.skipped),
+    ):
+        for case, details in entries:
+            # subtests are reported as part of the test they belong to
+            test_id = getattr(case, "test_case", case).id()
+            problems.setdefault(test_id, (outcome, details))
+    outcomes = [(test_id, *problems.pop(test_id, ("ok", ""))) for test_id in test_ids]
+    outcomes.extend((test_id, *problem) for test_id, problem in problems.items())
+    return outcomes
+
+
+def _cost(test_id: str) -> int:
+    # the rank of a test in _COST_ORDER, with everything else last
+    name = test_id.rsplit(".", 1)[-1]
+    for rank, prefix in enumerate(_COST_ORDER):
+        if name.startswith(prefix):
+            return rank
+    return len(_COST_ORDER)
+
+
+def _run_class(test_ids: list[str]) -> list[tuple[str, str, str]]:
+    # runs the tests of one class in a worker as a single suite, loaded again by id
+    result = unittest.TestResult()
+    unittest.defaultTestLoader.loadTestsFromNames(test_ids).run(result)
+    return _outcomes(test_ids, result)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m tests", description=__doc__)
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes"
+    )
+    parser.add_argument(
+        "-f", "--failfast", action="store_true", help="stop on the first error or failure"
+    )
+    args = parser.parse_args()
+
+    suite = unittest.defaultTestLoader.discover(os.path.dirname(__file__), top_level_dir=".")
+    # modules that were skipped (or failed to import) are reported through placeholder
+    # tests the loader creates on the fly, which cannot be loaded by id, so run here
+    tests = list(_iter_tests(suite))
+    placeholders = [test for test in tests if type(test).__module__ == "unittest.loader"]
+    classes = dict()
+    for test in tests:
+        if test not in placeholders:
+            classes.setdefault(type(test), []).append(test.id())
+    # classes are started by their cheapest test, and run their tests cheapest first
+    groups = sorted(
+        (sorted(test_ids, key=_cost) for test_ids in classes.values()),
+        key=lambda test_ids: _cost(test_ids[0]),
+    )
+
+    result = unittest.TestResult()
+    unittest.TestSuite(placeholders).run(result)
+    results = _outcomes([test.id() for test in placeholders], result)
+    with ProcessPoolExecutor(args.workers) as executor:
+        pending = {executor.submit(_run_class, test_ids) for test_ids in groups}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results.extend(future.result())
+            if args.failfast and any(outcome in _FAILED for _, outcome, _ in results):
+                # classes already running finish, the rest are never started
+                for future in pending:
+                    future.cancel()
+                for future in pending:
+                    if not future.cancelled():
+                        results.extend(future.result())
+                break
+
+    counts = dict()
+    for test_id, outcome, details in results:
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if outcome in _FAILED:
+            sys.stderr.write(f"{'=' * 70}\n{outcome}: {test_id}\n{'-' * 70}\n{details}\n")
+
+    failed = sum(counts.get(outcome, 0) for outcome in _FAILED)
+    summary = ", ".join(f"{outcome}={count}" for outcome, count in sorted(counts.items()))
+    sys.stderr.write(f"Ran {len(results)} tests: {'FAILED' if failed else 'OK'} ({summary})\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
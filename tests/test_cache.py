@@ -0,0 +1,196 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from mips_tester import MipsState, TestResult
+from mips_tester.core import config
+from mips_tester import cache, runner
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        config.cache_dir = self.temp_path / "cache"
+
+        self.asm = self.temp_path / "prog.asm"
+        self.asm.write_text("main: li $t0, 5\n")
+        self.harness = self.temp_path / "harness.asm"
+        self.harness.write_text("j main\n")
+        self.expected_state = MipsState(registers={"t0": "5"})
+
+    def tearDown(self):
+        # test_assemble keeps what it returns in the process-wide assemble cache
+        runner._assemble_cache.pop(runner._assemble_key(self.asm, self.harness), None)
+        config.cache_dir = None
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_inputs(self):
+        key = cache.result_key(self.asm, self.harness, self.expected_state, 100)
+        self.assertEqual(
+            key, cache.result_key(self.asm, self.harness, self.expected_state, 100)
+        )
+        self.assertNotEqual(
+            key, cache.result_key(self.asm, self.harness, self.expected_state, 200)
+        )
+        self.assertNotEqual(
+            key,
+            cache.result_key(
+                self.asm, self.harness, MipsState(registers={"t0": "6"}), 100
+            ),
+        )
+        self.asm.write_text("main: li $t0, 6\n")
+        self.assertNotEqual(
+            key, cache.result_key(self.asm, self.harness, self.expected_state, 100)
+        )
+
+    def test_load_missing(self):
+        self.assertIsNone(cache.load_result("0" * 64))
+
+    def test_store_and_load(self):
+        result = TestResult(success=True, score=0.5, messages=["Incorrect value"])
+        cache.store_result("abc", result)
+        self.assertEqual(cache.load_result("abc"), result)
+
+    def test_final_state_uses_cache(self):
+        # a cached result is returned without launching mars
+        result = TestResult(success=True, score=1.0)
+        key = cache.result_key(
+            self.asm, self.harness, self.expected_state, config.default_max_steps
+        )
+        cache.store_result(key, result)
+        self.assertEqual(
+            runner.test_final_state(self.expected_state, self.harness, self.asm),
+            result,
+        )
+
+    def test_assemble_uses_cache(self):
+        # a successful assemble cached by an earlier process is reused without mars
+        result = TestResult(success=True, score=1.0)
+        cache.store_result(runner._assemble_key(self.asm, self.harness), result)
+        self.assertEqual(runner.test_assemble(self.asm, self.harness), result)
+
+
+class TestAssembleFailureCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.asm = self.temp_path / "invalid.asm"
+        self.asm.write_text("invalid instruction\n")
+        self.key = runner._assemble_key(self.asm, None)
+
+    def tearDown(self):
+        runner._assemble_cache.pop(self.key, None)
+        self.temp_dir.cleanup()
+
+    def test_run_reuses_failed_assemble(self):
+        # sources known not to assemble are reported without running mars
+        runner._assemble_cache[self.key] = runner._ASSEMBLE_FAILURE
+        for check in (runner.test_assemble, runner.test_run):
+            result = check(self.asm)
+            self.assertFalse(result.success)
+            self.assertEqual(result.messages, ["Program did not assemble correctly"])
+
+
+class TestLaunchFailure(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.asm = self.temp_path / "prog.asm"
+        self.asm.write_text("main: li $t0, 7\n")
+        self.harness = self.temp_path / "harness.asm"
+        self.harness.write_text("j main\n")
+        config.cache_dir = self.temp_path / "cache"
+
+        # an empty PATH, so java cannot be found
+        self.path = os.environ["PATH"]
+        os.environ["PATH"] = str(self.temp_path)
+
+    def tearDown(self):
+        os.environ["PATH"] = self.path
+        config.cache_dir = None
+        self.temp_dir.cleanup()
+
+    def test_missing_java_fails_checks(self):
+        # every check fails with a result rather than raising, and nothing is cached
+        run_cache = dict(runner._run_cache)
+        for check in (
+            lambda: runner.test_assemble(self.asm, self.harness),
+            lambda: runner.test_run(self.asm, self.harness),
+            # an empty harness name means no harness, as in test_assemble
+            lambda: runner.test_run(self.asm, ""),
+            lambda: runner.test_final_state({"registers": {"t0": "7"}}, self.harness, self.asm),
+        ):
+            result = check()
+            self.assertFalse(result.success)
+            self.assertEqual(result.score, 0.0)
+
+        for result in (
+            runner.test_run(self.asm, self.harness),
+            runner.test_final_state({"registers": {"t0": "7"}}, self.harness, self.asm),
+        ):
+            self.assertIn("Mars could not be launched", result.messages[0])
+            self.assertIn("java", result.messages[0])
+
+        self.assertEqual(runner._run_cache, run_cache)
+        self.assertNotIn(runner._assemble_key(self.asm, self.harness), runner._assemble_cache)
+        self.assertFalse(config.cache_dir.exists() and any(config.cache_dir.iterdir()))
+
+
+class TestRunCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.asm = self.temp_path / "prog.asm"
+        self.asm.write_text("main: li $t0, 5\n")
+        self.copy = self.temp_path / "copy.asm"
+        self.copy.write_text("main: li $t0, 5\n")
+        self.run_cache_size = config.run_cache_size
+        runner.clear_run_cache()
+
+    def tearDown(self):
+        config.run_cache_size = self.run_cache_size
+        runner.clear_run_cache()
+        self.temp_dir.cleanup()
+
+    def run_program(self, code):
+        # a command that finishes like a successful mars run, with a source to key on
+        command = [sys.executable, "-c", code, str(self.asm)]
+        return runner._run_mars_cached(command, [self.asm], 10.0)
+
+    def test_key_depends_on_contents(self):
+        # the same program in another file shares a run, an edited one does not
+        key = runner._run_key(["java", str(self.asm), "100"], [self.asm])
+        self.assertEqual(key, runner._run_key(["java", str(self.copy), "100"], [self.copy]))
+        self.assertNotEqual(key, runner._run_key(["java", str(self.asm), "200"], [self.asm]))
+        self.asm.write_text("main: li $t0, 6\n")
+        self.assertNotEqual(key, runner._run_key(["java", str(self.asm), "100"], [self.asm]))
+
+    def test_least_recently_used_run_evicted(self):
+        config.run_cache_size = 2
+        first = self.run_program("print(1)")
+        second = self.run_program("print(2)")
+        self.assertIs(self.run_program("print(1)"), first)
+        self.run_program("print(3)")
+        self.assertEqual(len(runner._run_cache), 2)
+        # the run of print(2) was used least recently, so it is the one dropped
+        self.assertIs(self.run_program("print(1)"), first)
+        self.assertIsNot(self.run_program("print(2)"), second)
+        self.assertEqual(len(runner._run_cache), 2)
+
+    def test_disabled_and_cleared(self):
+        first = self.run_program("print(1)")
+        self.assertIs(self.run_program("print(1)"), first)
+        runner.clear_run_cache()
+        self.assertIsNot(self.run_program("print(1)"), first)
+
+        config.run_cache_size = 0
+        runner.clear_run_cache()
+        self.run_program("print(1)")
+        self.assertEqual(len(runner._run_cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,99 +1,105 @@
+import re
 import unittest
 from pathlib import Path
-from tempfile import TemporaryDirectory
 
-from mips_tester import create_harness, MipsState, JumpType, configure, MemorySize
+from mips_tester import create_harness, MipsState, JumpType, MemorySize
+from tests.utils import configure_scratch
 
-"""
-Todo: in setup, download mars if specified path does not exist
-"""
+
+def setUpModule():
+    global temp_dir
+    temp_dir = configure_scratch()
+
+
+def tearDownModule():
+    temp_dir.cleanup()
 
 
 class TestHarness(unittest.TestCase):
+    BASIC_STATE = {
+        "registers": {"a0": "10", "v0": "20"},
+        "memory": {"1000": "30", "1004": "40"},
+    }
+    HEX_STATE = {
+        "registers": {"a0": "0x10", "v0": "0x20"},
+        "memory": {"0x1000": "0x30", "0x1004": "0x40"},
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        # states shared by several tests are validated once. create_harness only
+        # reads its initial state, so sharing them between tests is safe
+        cls.basic_state = MipsState.from_dict(cls.BASIC_STATE)
+        cls.hex_state = MipsState.from_dict(cls.HEX_STATE)
+
+        # one scratch directory is shared by every test
+        cls.temp_path = Path(temp_dir.name)
+
     def setUp(self):
-        self.temp_dir = TemporaryDirectory()
-        self.temp_path = Path(self.temp_dir.name)
-        # !  <---  MAY NEED TO MODIFY THIS LINE TO REFLECT YOUR mars.jar LOCATION  --->
-        mars_jar_path = Path("./mars.jar")
-        if not mars_jar_path.exists():
-            self.skipTest(
-                "mars.jar not found.  Place mars.jar in the same directory as this test."
-            )
-        configure(
-            mars_path=mars_jar_path,
-            max_steps=1000,
-            output_harness="test_harness.asm",
-        )
+        # tests reuse harness names, so clear the last test's harnesses to make
+        # sure each test only reads what it wrote itself
+        for path in self.temp_path.iterdir():
+            path.unlink()
 
-    def tearDown(self):
-        self.temp_dir.cleanup()
+    @staticmethod
+    def harness_pattern(*lines):
+        """Pattern matching harness text that contains the given lines in order."""
+        return re.compile(b".*?".join(map(re.escape, lines)), re.DOTALL)
+
+    def assertAllIn(self, members, container):
+        """Checks every member is in container, reporting all missing members at once."""
+        missing = [member for member in members if member not in container]
+        if missing:
+            self.fail(f"{missing!r} not found in {container!r}")
 
     def test_create_harness_basic(self):
-        initial_state = MipsState.from_dict(
-            {
-                "registers": {"a0": "10", "v0": "20"},
-                "memory": {"1000": "30", "1004": "40"},
-            }
-        )
+        initial_state = self.basic_state
         harness_path = create_harness(
             initial_state,
             output_harness_name=self.temp_path / "test_harness.asm",
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $a0, 10", content)
-            self.assertIn("li $v0, 20", content)
-            self.assertIn("li $t0, 30", content)
-            self.assertIn("sw $t0, ($t1)", content)
-            self.assertIn("j main", content)
+        content = harness_path.read_bytes()
+        self.assertRegex(
+            content,
+            self.harness_pattern(
+                b"li $t0, 30", b"sw $t0, ($t1)", b"li $v0, 20", b"li $a0, 10", b"j main"
+            ),
+        )
 
     def test_create_harness_file_with_dict(self):
-        initial_state = {
-            "registers": {"a0": "10", "v0": "20"},
-            "memory": {"1000": "30", "1004": "40"},
-        }
+        initial_state = self.BASIC_STATE
         harness_path = create_harness(
             initial_state,
             output_harness_name=self.temp_path / "test_harness.asm",
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $a0, 10", content)
-            self.assertIn("li $v0, 20", content)
-            self.assertIn("li $t0, 30", content)
-            self.assertIn("sw $t0, ($t1)", content)
-            self.assertIn("j main", content)
+        content = harness_path.read_bytes()
+        self.assertRegex(
+            content,
+            self.harness_pattern(
+                b"li $t0, 30", b"sw $t0, ($t1)", b"li $v0, 20", b"li $a0, 10", b"j main"
+            ),
+        )
 
     def test_create_harness_with_custom_label(self):
-        initial_state = MipsState.from_dict(
-            {
-                "registers": {"a0": "10", "v0": "20"},
-                "memory": {"1000": "30", "1004": "40"},
-            }
-        )
+        initial_state = self.basic_state
         harness_path = create_harness(
             initial_state,
             label="start",
             output_harness_name=self.temp_path / "test_harness.asm",
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $a0, 10", content)
-            self.assertIn("li $v0, 20", content)
-            self.assertIn("li $t0, 30", content)
-            self.assertIn("sw $t0, ($t1)", content)
-            self.assertIn("j start", content)
+        content = harness_path.read_bytes()
+        self.assertRegex(
+            content,
+            self.harness_pattern(
+                b"li $t0, 30", b"sw $t0, ($t1)", b"li $v0, 20", b"li $a0, 10", b"j start"
+            ),
+        )
 
     def test_create_harness_jal(self):
-        initial_state = MipsState.from_dict(
-            {
-                "registers": {"a0": "10", "v0": "20"},
-                "memory": {"1000": "30", "1004": "40"},
-            }
-        )
+        initial_state = self.basic_state
         # test 1 with default label:
         harness_path = create_harness(
             initial_state,
@@ -101,13 +107,13 @@ class TestHarness(unittest.TestCase):
             jump_type=JumpType.JUMP_AND_LINK,
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $a0, 10", content)
-            self.assertIn("li $v0, 20", content)
-            self.assertIn("li $t0, 30", content)
-            self.assertIn("sw $t0, ($t1)", content)
-            self.assertIn("jal main", content)
+        content = harness_path.read_bytes()
+        self.assertRegex(
+            content,
+            self.harness_pattern(
+                b"li $t0, 30", b"sw $t0, ($t1)", b"li $v0, 20", b"li $a0, 10", b"jal main"
+            ),
+        )
 
         # test 2 with custom label:
         harness_path = create_harness(
@@ -117,13 +123,13 @@ class TestHarness(unittest.TestCase):
             jump_type=JumpType.JUMP_AND_LINK,
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $a0, 10", content)
-            self.assertIn("li $v0, 20", content)
-            self.assertIn("li $t0, 30", content)
-            self.assertIn("sw $t0, ($t1)", content)
-            self.assertIn("jal start", content)
+        content = harness_path.read_bytes()
+        self.assertRegex(
+            content,
+            self.harness_pattern(
+                b"li $t0, 30", b"sw $t0, ($t1)", b"li $v0, 20", b"li $a0, 10", b"jal start"
+            ),
+        )
 
     def test_create_harness_empty_state(self):
         initial_state = MipsState()
@@ -133,9 +139,8 @@ class TestHarness(unittest.TestCase):
             output_harness_name=self.temp_path / "test_harness.asm",
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("j main", content)
+        content = harness_path.read_bytes()
+        self.assertIn(b"j main", content)
 
         # test 2 with custom label:
         harness_path = create_harness(
@@ -144,30 +149,24 @@ class TestHarness(unittest.TestCase):
             output_harness_name=self.temp_path / "test_harness.asm",
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("j start", content)
+        content = harness_path.read_bytes()
+        self.assertIn(b"j start", content)
 
     def test_create_harness_hex_values(self):
-        initial_state = MipsState.from_dict(
-            {
-                "registers": {"a0": "0x10", "v0": "0x20"},
-                "memory": {"0x1000": "0x30", "0x1004": "0x40"},
-            }
-        )
+        initial_state = self.hex_state
         # test 1: default label
         harness_path = create_harness(
             initial_state,
             output_harness_name=self.temp_path / "test_harness.asm",
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $a0, 0x10", content)
-            self.assertIn("li $v0, 0x20", content)
-            self.assertIn("li $t0, 0x30", content)
-            self.assertIn("sw $t0, ($t1)", content)
-            self.assertIn("j main", content)
+        content = harness_path.read_bytes()
+        self.assertRegex(
+            content,
+            self.harness_pattern(
+                b"li $t0, 0x30", b"sw $t0, ($t1)", b"li $v0, 0x20", b"li $a0, 0x10", b"j main"
+            ),
+        )
 
         # test 2: custom label
         harness_path = create_harness(
@@ -176,13 +175,13 @@ class TestHarness(unittest.TestCase):
             output_harness_name=self.temp_path / "test_harness.asm",
         )
         self.assertTrue(harness_path.exists())
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $a0, 0x10", content)
-            self.assertIn("li $v0, 0x20", content)
-            self.assertIn("li $t0, 0x30", content)
-            self.assertIn("sw $t0, ($t1)", content)
-            self.assertIn("j start", content)
+        content = harness_path.read_bytes()
+        self.assertRegex(
+            content,
+            self.harness_pattern(
+                b"li $t0, 0x30", b"sw $t0, ($t1)", b"li $v0, 0x20", b"li $a0, 0x10", b"j start"
+            ),
+        )
 
     def test_create_harness_invalid_label(self):
         # test with a label that contains spaces
@@ -205,11 +204,15 @@ class TestHarness(unittest.TestCase):
         )
 
         # Verify harness content
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $t0, 0xAB", content)
-            self.assertIn("la $t1, 0x10010000", content)
-            self.assertIn("sb $t0, ($t1)", content)
+        content = harness_path.read_bytes()
+        self.assertAllIn(
+            [
+                b"li $t0, 0xAB",
+                b"la $t1, 0x10010000",
+                b"sb $t0, ($t1)",
+            ],
+            content,
+        )
 
     def test_create_harness_with_halfword_memory(self):
         """Test creating a harness with halfword memory access."""
@@ -222,11 +225,15 @@ class TestHarness(unittest.TestCase):
         )
 
         # Verify harness content
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $t0, 0xABCD", content)
-            self.assertIn("la $t1, 0x10010002", content)
-            self.assertIn("sh $t0, ($t1)", content)
+        content = harness_path.read_bytes()
+        self.assertAllIn(
+            [
+                b"li $t0, 0xABCD",
+                b"la $t1, 0x10010002",
+                b"sh $t0, ($t1)",
+            ],
+            content,
+        )
 
     def test_create_harness_with_word_memory(self):
         """Test creating a harness with word memory access."""
@@ -239,11 +246,15 @@ class TestHarness(unittest.TestCase):
         )
 
         # Verify harness content
-        with open(harness_path, "r") as f:
-            content = f.read()
-            self.assertIn("li $t0, 0xABCD1234", content)
-            self.assertIn("la $t1, 0x10010004", content)
-            self.assertIn("sw $t0, ($t1)", content)
+        content = harness_path.read_bytes()
+        self.assertAllIn(
+            [
+                b"li $t0, 0xABCD1234",
+                b"la $t1, 0x10010004",
+                b"sw $t0, ($t1)",
+            ],
+            content,
+        )
 
     def test_mixed_memory_types_harness(self):
         """Test creating a harness with mixed memory type accesses."""
@@ -260,22 +271,36 @@ class TestHarness(unittest.TestCase):
         )
 
         # Verify harness content
-        with open(harness_path, "r") as f:
-            content = f.read()
-            # Check byte
-            self.assertIn("li $t0, 0xAB", content)
-            self.assertIn("la $t1, 0x10010000", content)
-            self.assertIn("sb $t0, ($t1)", content)
-
-            # Check halfword
-            self.assertIn("li $t0, 0xCDEF", content)
-            self.assertIn("la $t1, 0x10010002", content)
-            self.assertIn("sh $t0, ($t1)", content)
-
-            # Check word
-            self.assertIn("li $t0, 0x12345678", content)
-            self.assertIn("la $t1, 0x10010004", content)
-            self.assertIn("sw $t0, ($t1)", content)
+        content = harness_path.read_bytes()
+        # Check byte
+        self.assertAllIn(
+            [
+                b"li $t0, 0xAB",
+                b"la $t1, 0x10010000",
+                b"sb $t0, ($t1)",
+            ],
+            content,
+        )
+
+        # Check halfword
+        self.assertAllIn(
+            [
+                b"li $t0, 0xCDEF",
+                b"la $t1, 0x10010002",
+                b"sh $t0, ($t1)",
+            ],
+            content,
+        )
+
+        # Check word
+        self.assertAllIn(
+            [
+                b"li $t0, 0x12345678",
+                b"la $t1, 0x10010004",
+                b"sw $t0, ($t1)",
+            ],
+            content,
+        )
 
     def test_memory_alignment_validation_halfword(self):
         """Test validation of halfword memory alignment."""
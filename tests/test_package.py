@@ -0,0 +1,27 @@
+import subprocess
+import sys
+import unittest
+
+
+class TestPackage(unittest.TestCase):
+    def test_submodules_are_attributes(self):
+        # a fresh interpreter, so no submodule has been imported yet
+        code = (
+            "import mips_tester\n"
+            "print(mips_tester.core.config.default_max_steps)\n"
+            "print(mips_tester.runner.test_run is mips_tester.test_run)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.split(), ["10000", "True"])
+
+    def test_unknown_attribute(self):
+        import mips_tester
+
+        with self.assertRaises(AttributeError):
+            mips_tester.not_a_name
+
+
+if __name__ == "__main__":
+    unittest.main()
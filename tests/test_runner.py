@@ -1,39 +1,56 @@
+import os
+import textwrap
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from tempfile import TemporaryDirectory
+
+from tests.utils import configure_scratch, require_mars
+
+# !  <---  MAY NEED TO MODIFY THIS LINE TO REFLECT YOUR mars.jar LOCATION  --->
+MARS_JAR_PATH = Path("./mars.jar")
+# downloads mars.jar if it is missing. when it cannot be downloaded, the whole module
+# is skipped before importing (and loading) mips_tester
+require_mars(MARS_JAR_PATH)
 
 from mips_tester import (
-    configure,
     MipsState,
     test_assemble,
     test_run,
     test_final_state,
+    test_final_states,
+    test_final_state_batch,
+    compile_expected,
     MemorySize,
     create_harness,
     JumpType,
 )
+from mips_tester import runner
 
 
-class TestRunnerIntegration(unittest.TestCase):
-    def setUp(self):
-        self.temp_dir = TemporaryDirectory()
-        self.temp_path = Path(self.temp_dir.name)
-        # !  <---  MAY NEED TO MODIFY THIS LINE TO REFLECT YOUR mars.jar LOCATION  --->
-        mars_jar_path = Path("./mars.jar")
-        if not mars_jar_path.exists():
-            self.skipTest(
-                "mars.jar not found.  Place mars.jar in the same directory as this test."
-            )
-
-        configure(
-            mars_path=str(mars_jar_path),
-            max_steps=100,
-            output_harness="test_harness.asm",
-        )
+def setUpModule():
+    global temp_dir
+    temp_dir = configure_scratch(mars_path=str(MARS_JAR_PATH), max_steps=100)
+
+
+def tearDownModule():
+    temp_dir.cleanup()
+
+
+CUSTOM_LABEL = "custom_entry"
+CUSTOM_JAL_LABEL = "my_custom_label"
+
+
+def _asm(source: str) -> bytes:
+    # fixture source without the indentation it has in this file, ready to be written
+    return textwrap.dedent(source).lstrip().encode()
+
 
-        # Create dummy MIPS files for testing
-        self.valid_asm = self.temp_path / "valid.asm"
-        valid_asm_content = """
+# the programs and harnesses the tests run, by the test class attribute holding their
+# path. the contents are dedented and encoded once here and written as is
+FIXTURES: dict[str, tuple[str, bytes]] = {
+    "valid_asm": (
+        "valid.asm",
+        _asm("""
         .text
         .globl main
         main:
@@ -41,43 +58,38 @@ class TestRunnerIntegration(unittest.TestCase):
         xor $t1, $t0, $s2
         li $v0, 10
         syscall
-        """
-        self.valid_asm.write_text(valid_asm_content)
-
-        self.valid_asm_harness = self.temp_path / "valid_harness.asm"
-        valid_asm_harness = """
+        """),
+    ),
+    "valid_asm_harness": (
+        "valid_harness.asm",
+        _asm("""
         .text
         subi $t0, $0, 5
         li $v0, 69
         j main
-        """
-        self.valid_asm_harness.write_text(valid_asm_harness)
-
-        self.invalid_asm = self.temp_path / "invalid.asm"
-        self.invalid_asm.write_text("invalid instruction")
-
-        self.invalid_asm_harness = self.temp_path / "invalid_harness.asm"
-        invalid_asm_harness = """
+        """),
+    ),
+    "invalid_asm": ("invalid.asm", b"invalid instruction"),
+    "invalid_asm_harness": (
+        "invalid_harness.asm",
+        _asm("""
         hi this is 
         invalid
-        """
-        self.invalid_asm_harness.write_text(invalid_asm_harness)
-
-        self.valid_asm_runtime_exception = (
-            self.temp_path / "valid_runtime_exception.asm"
-        )
-        valid_asm_runtime_exception_content = """
+        """),
+    ),
+    "valid_asm_runtime_exception": (
+        "valid_runtime_exception.asm",
+        _asm("""
         .text
         .globl main
         main:
         la $t0, 0x00000000
         sw $t1, ($t0)
-        """
-        self.valid_asm_runtime_exception.write_text(
-            valid_asm_runtime_exception_content)
-
-        self.memory_test_asm = self.temp_path / "memory_test.asm"
-        memory_test_content = """
+        """),
+    ),
+    "memory_test_asm": (
+        "memory_test.asm",
+        _asm("""
         .text
         .globl main
         main:
@@ -98,11 +110,11 @@ class TestRunnerIntegration(unittest.TestCase):
         la $t1, 0x10010004
         sw $t0, 0($t1)
         lw $t4, 0($t1)
-        """
-        self.memory_test_asm.write_text(memory_test_content)
-
-        self.byte_array_prog = self.temp_path / "byte_array_test.asm"
-        byte_array_content = """
+        """),
+    ),
+    "byte_array_prog": (
+        "byte_array_test.asm",
+        _asm("""
         .text
         .globl main
         main:
@@ -111,32 +123,32 @@ class TestRunnerIntegration(unittest.TestCase):
         lb $s1, 1($t1)
         lb $s2, 2($t1)
         lb $s3, 3($t1)
-        """
-        self.byte_array_prog.write_text(byte_array_content)
-
-        self.hw_array_prog = self.temp_path / "hw_array_test.asm"
-        hw_array_content = """
+        """),
+    ),
+    "hw_array_prog": (
+        "hw_array_test.asm",
+        _asm("""
         .text
         .globl main
         main:
         la $t1, 0x10010010
         lh $s0, 0($t1)
         lh $s1, 2($t1)
-        """
-        self.hw_array_prog.write_text(hw_array_content)
-
-        self.w_array_prog = self.temp_path / "w_array_test.asm"
-        w_array_content = """
+        """),
+    ),
+    "w_array_prog": (
+        "w_array_test.asm",
+        _asm("""
         .text
         .globl main
         main:
         la $t1, 0x10010010
         lw $s0, 0($t1)
-        """
-        self.w_array_prog.write_text(w_array_content)
-
-        self.return_value_asm = self.temp_path / "return_values.asm"
-        return_value_content = """
+        """),
+    ),
+    "return_value_asm": (
+        "return_values.asm",
+        _asm("""
         .text
         .globl main
         main:
@@ -145,183 +157,148 @@ class TestRunnerIntegration(unittest.TestCase):
         li $v1, 84
         
         jr $ra
-        """
-        self.return_value_asm.write_text(return_value_content)
-
-        self.custom_label_asm = self.temp_path / "custom_label.asm"
-        self.custom_label_asm_name = "custom_entry"
-        custom_label_content = f"""
+        """),
+    ),
+    "custom_label_asm": (
+        "custom_label.asm",
+        _asm(f"""
         .text
-        .globl {self.custom_label_asm_name}
-        {self.custom_label_asm_name}:
+        .globl {CUSTOM_LABEL}
+        {CUSTOM_LABEL}:
         li $t0, 0xABCDEF
         li $t1, 0x123456
         
         li $v0, 10
         syscall
-        """
-        self.custom_label_asm.write_text(custom_label_content)
-
-        # Create a MIPS program with the custom label
-        self.custom_label_jal_asm_name = "my_custom_label"
-        self.custom_label_jal_asm = self.temp_path / "custom_label_jal.asm"
-        custom_label_jal_content = f"""
+        """),
+    ),
+    # a MIPS program with the custom label
+    "custom_label_jal_asm": (
+        "custom_label_jal.asm",
+        _asm(f"""
         .text
-        .globl {self.custom_label_jal_asm_name}
-        {self.custom_label_jal_asm_name}:
+        .globl {CUSTOM_JAL_LABEL}
+        {CUSTOM_JAL_LABEL}:
         # subroutine to add one to argument $a0 and return value in $v0
         addi $v0, $a0, 1
         jr $ra
-        """
-        self.custom_label_jal_asm.write_text(custom_label_jal_content)
-
-    def tearDown(self):
-        self.temp_dir.cleanup()
-
-    def test_assemble_success(self):
-        result = test_assemble(str(self.valid_asm))
-        self.assertTrue(
-            result.success, msg=f"Assembly of valid program failed: {result.messages}"
-        )
-
-    def test_assemble_success_harness(self):
-        result = test_assemble(
-            str(self.valid_asm), harness_name=str(self.valid_asm_harness)
-        )
-        self.assertTrue(
-            result.success,
-            msg=f"Assembly of valid program with valid harness failed: {result.messages}",
-        )
-
-    def test_assemble_failure(self):
-        result = test_assemble(str(self.invalid_asm))
-        self.assertFalse(
-            result.success, msg=f"Assembly unexpectedly succeeded.")
-
-    def test_assemble_failure_invalid_harness(self):
-        result = test_assemble(
-            str(self.valid_asm), harness_name=str(self.invalid_asm_harness)
-        )
-        self.assertFalse(
-            result.success,
-            msg=f"Assembly of valid program with invalid harness unexpectedly succeeded: {result.messages}",
-        )
-
-    def test_assemble_failure_valid_harness(self):
-        result = test_assemble(
-            str(self.invalid_asm), harness_name=str(self.valid_asm_harness)
-        )
-        self.assertFalse(
-            result.success,
-            msg=f"Assembly of invalid program with valid harness unexpectedly succeeded: {result.messages}",
-        )
-
-    def test_run_success(self):
-        result = test_run(str(self.valid_asm))
-        self.assertTrue(
-            result.success, msg=f"Run of valid program failed: {result.messages}"
-        )
-
-    def test_run_success_harness(self):
-        result = test_run(str(self.valid_asm),
-                          harness_name=str(self.valid_asm_harness))
-        self.assertTrue(
-            result.success,
-            msg=f"Run of valid program with valid harness failed: {result.messages}",
-        )
-
-    def test_run_failure(self):
-        result = test_run(str(self.invalid_asm))
-        self.assertFalse(
-            result.success, msg=f"Run of invalid program unexpectedly succeeded."
-        )
-
-    def test_run_failure_invalid_harness(self):
-        result = test_run(
-            str(self.valid_asm), harness_name=str(self.invalid_asm_harness)
-        )
-        self.assertFalse(
-            result.success,
-            msg=f"Run of valid program with invalid harness unexpectedly succeeded: {result.messages}",
-        )
-
-    def test_run_failure_valid_harness(self):
-        result = test_run(
-            str(self.invalid_asm), harness_name=str(self.valid_asm_harness)
-        )
-        self.assertFalse(
-            result.success,
-            msg=f"Run of invalid program with valid harness unexpectedly succeeded: {result.messages}",
-        )
-
-    def test_run_runtime_exception(self):
-        result = test_run(str(self.valid_asm_runtime_exception))
-        self.assertFalse(
-            result.success,
-            msg=f"Run of program with runtime exception unexpectedly succeeded: {result.messages}",
-        )
+        """),
+    ),
+}
 
-    def test_final_state_register_success(self):
-        expected_state = MipsState(registers={"t0": "0x5"}, memory={})
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}"
-        )
-        self.assertAlmostEqual(result.score, 1.0)
 
-    def test_final_state_register_failure(self):
-        expected_state = MipsState(registers={"t0": "0x10"}, memory={})
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}."
-        )
-        self.assertLess(result.score, 1.0)
-
-    def test_final_state_memory_failure_legacy(self):
-        expected_state = MipsState.from_dict(
-            {"registers": {}, "memory": {"0x10010000": "0x10"}}
-        )
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}."
-        )
-        self.assertLess(result.score, 1.0)
-
-    def test_final_state_memory_failure(self):
-        expected_state = MipsState(
-            registers={}, memory={"0x10010000": {"value": "0xFF", "size": "word"}}
-        )
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}."
-        )
-        self.assertLess(result.score, 1.0)
+class TestRunnerIntegration(unittest.TestCase):
+    custom_label_asm_name = CUSTOM_LABEL
+    custom_label_jal_asm_name = CUSTOM_JAL_LABEL
+
+    @classmethod
+    def setUpClass(cls):
+        # expected state shared by several tests. checks only read their expected
+        # states, so one instance is validated once and reused
+        cls.t0_state = MipsState(registers={"t0": "0x5"})
+
+        # the program files never change, so they are written once for every test
+        cls.temp_path = Path(temp_dir.name)
+        for attr, (name, content) in FIXTURES.items():
+            path = cls.temp_path / name
+            # each fixture is one small write, so skip the buffered writer's copy
+            with open(path, "wb", buffering=0) as f:
+                f.write(content)
+            setattr(cls, attr, path)
 
-    def test_final_state_partial_success(self):
-        # Test with both correct and incorrect values to check partial success
-        expected_state = MipsState(
-            registers={"t0": "0x5", "t1": "0x10"}, memory={}
-        )  # t0 correct, t1 incorrect
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}"
-        )
-        self.assertGreater(result.score, 0.0)
-        self.assertLess(result.score, 1.0)
-        self.assertAlmostEqual(result.score, 0.5)
+    def setUp(self):
+        # mips_tester reuses assembles and runs within a process. each test checks its
+        # own calls against mars, so nothing carries over from earlier tests
+        runner._assemble_cache.clear()
+        runner.clear_run_cache()
+
+    # (name, program, harness, expected success, expected first message) for the
+    # assemble and run checks, with the fixtures given by their class attribute:
+    ASSEMBLE_CASES = [
+        ("success", "valid_asm", None, True, None),
+        ("success_harness", "valid_asm", "valid_asm_harness", True, None),
+        ("failure", "invalid_asm", None, False, None),
+        ("failure_invalid_harness", "valid_asm", "invalid_asm_harness", False, None),
+        ("failure_valid_harness", "invalid_asm", "valid_asm_harness", False, None),
+    ]
+    RUN_CASES = [
+        ("success", "valid_asm", None, True, None),
+        ("success_harness", "valid_asm", "valid_asm_harness", True, None),
+        ("failure", "invalid_asm", None, False, "did not assemble correctly"),
+        (
+            "runtime_exception",
+            "valid_asm_runtime_exception",
+            None,
+            False,
+            "runtime errors",
+        ),
+        ("failure_invalid_harness", "valid_asm", "invalid_asm_harness", False, None),
+        ("failure_valid_harness", "invalid_asm", "valid_asm_harness", False, None),
+    ]
+
+    def check_cases(self, check, cases):
+        """Runs every case through check at once, then checks each result in a subTest."""
+
+        def execute(case):
+            _, program, harness, _, _ = case
+            harness_name = None if harness is None else str(getattr(self, harness))
+            return check(str(getattr(self, program)), harness_name=harness_name)
+
+        # each case waits on its own Mars JVM, so threads are enough to overlap them
+        with ThreadPoolExecutor(os.cpu_count()) as executor:
+            results = list(executor.map(execute, cases))
+
+        for (name, _, _, success, message), result in zip(cases, results):
+            with self.subTest(case=name):
+                self.assertEqual(result.success, success, msg=result.messages)
+                if message is not None:
+                    self.assertIn(message, result.messages[0])
+
+    def test_assemble_cases(self):
+        self.check_cases(test_assemble, self.ASSEMBLE_CASES)
+
+    def test_run_cases(self):
+        self.check_cases(test_run, self.RUN_CASES)
+
+    # expected states checked against the one run of valid_asm, with the score each
+    # should get (None for any score below 1.0):
+    FINAL_STATE_CASES = [
+        ("register_success", {"registers": {"t0": "0x5"}}, 1.0),
+        ("register_failure", {"registers": {"t0": "0x10"}}, None),
+        ("memory_failure_legacy", {"memory": {"0x10010000": "0x10"}}, None),
+        (
+            "memory_failure",
+            {"memory": {"0x10010000": {"value": "0xFF", "size": "word"}}},
+            None,
+        ),
+        # t0 correct, t1 incorrect:
+        ("partial_success", {"registers": {"t0": "0x5", "t1": "0x10"}}, 0.5),
+        ("empty_expected_state", {}, 1.0),
+        ("memory_text_region_legacy", {"memory": {"0x400000": "0x0"}}, None),
+        ("memory_text_region", {"memory": {"0x400000": {"value": "0x0"}}}, None),
+    ]
+
+    def test_final_state_cases(self):
+        # every case only differs in its expected state, so they are all scored
+        # against a single run of the program
+        results = test_final_states(
+            [MipsState.from_dict(state) for _, state, _ in self.FINAL_STATE_CASES],
+            str(self.valid_asm_harness),
+            str(self.valid_asm),
+        )
+        self.assertEqual(len(results), len(self.FINAL_STATE_CASES))
+        for (name, _, score), result in zip(self.FINAL_STATE_CASES, results):
+            with self.subTest(case=name):
+                self.assertTrue(
+                    result.success, msg=f"Final state check failed: {result.messages}"
+                )
+                if score is None:
+                    self.assertLess(result.score, 1.0)
+                else:
+                    self.assertAlmostEqual(result.score, score)
 
     def test_final_state_assembly_failure(self):
-        expected_state = MipsState(registers={"t0": "0x5"}, memory={})
+        expected_state = self.t0_state
         result = test_final_state(
             expected_state, str(self.valid_asm_harness), str(self.invalid_asm)
         )
@@ -330,7 +307,7 @@ class TestRunnerIntegration(unittest.TestCase):
         self.assertIn("did not assemble correctly", result.messages[0])
 
     def test_final_state_run_failure(self):
-        expected_state = MipsState(registers={"t0": "0x5"}, memory={})
+        expected_state = self.t0_state
         result = test_final_state(
             expected_state,
             str(self.valid_asm_harness),
@@ -340,39 +317,57 @@ class TestRunnerIntegration(unittest.TestCase):
         self.assertEqual(result.score, 0.0)
         self.assertIn("did not run correctly", result.messages[0])
 
-    def test_final_state_empty_expected_state(self):
-        # Test with empty expected state.  Should pass with a score of 1.0
-        expected_state = MipsState(registers={}, memory={})
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}"
-        )
+    def test_final_states_single_run(self):
+        # Each expected state is scored independently against the same run
+        expected_states = [
+            self.t0_state,
+            MipsState(registers={"t0": "0x5", "t1": "0x10"}),
+            {"registers": {}, "memory": {"0x10010000": "0x0"}},
+        ]
+        results = test_final_states(
+            expected_states, str(self.valid_asm_harness), str(self.valid_asm)
+        )
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.success for result in results))
+        self.assertAlmostEqual(results[0].score, 1.0)
+        self.assertAlmostEqual(results[1].score, 0.5)
+        self.assertAlmostEqual(results[2].score, 1.0)
+
+    def test_final_states_assembly_failure(self):
+        expected_states = [self.t0_state, MipsState()]
+        results = test_final_states(
+            expected_states, str(self.valid_asm_harness), str(self.invalid_asm)
+        )
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertFalse(result.success)
+            self.assertIn("did not assemble correctly", result.messages[0])
+
+    def test_final_state_batch(self):
+        # Results come back in the same order as the cases
+        cases = [
+            (self.t0_state, str(self.valid_asm_harness), str(self.valid_asm)),
+            (self.t0_state, str(self.valid_asm_harness), str(self.invalid_asm)),
+            (MipsState(registers={"t0": "0x10"}), str(self.valid_asm_harness), str(self.valid_asm)),
+        ]
+        results = test_final_state_batch(cases)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(results[0].success)
+        self.assertAlmostEqual(results[0].score, 1.0)
+        self.assertFalse(results[1].success)
+        self.assertIn("did not assemble correctly", results[1].messages[0])
+        self.assertTrue(results[2].success)
+        self.assertLess(results[2].score, 1.0)
+
+    def test_final_state_compiled_spec(self):
+        # A compiled expected state can be checked against several programs
+        spec = compile_expected({"registers": {"t0": "0x5"}})
+        self.assertEqual(spec.check_targets, ("t0",))
+        result = test_final_state(spec, str(self.valid_asm_harness), str(self.valid_asm))
+        self.assertTrue(result.success)
         self.assertAlmostEqual(result.score, 1.0)
-
-    def test_final_state_memory_text_region_success_legacy(self):
-        expected_state = MipsState.from_dict(
-            {"registers": {}, "memory": {"0x400000": "0x0"}}
-        )
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}."
-        )
-        self.assertLess(result.score, 1.0)
-
-    def test_final_state_memory_text_region_success(self):
-        expected_state = MipsState(registers={}, memory={
-                                   "0x400000": {"value": "0x0"}})
-        result = test_final_state(
-            expected_state, str(self.valid_asm_harness), str(self.valid_asm)
-        )
-        self.assertTrue(
-            result.success, msg=f"Final state check failed: {result.messages}."
-        )
-        self.assertLess(result.score, 1.0)
+        result = test_final_state(spec, str(self.valid_asm_harness), str(self.invalid_asm))
+        self.assertFalse(result.success)
 
     def test_final_state_byte_memory(self):
         """Test checking final state with byte memory accesses."""
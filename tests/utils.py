@@ -2,27 +2,220 @@
 Utility functions for tests
 """
 
-import requests
+import hashlib
+import http.client
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
 from pathlib import Path
+from tempfile import TemporaryDirectory
+
+MARS_URL = "https://dpetersanderson.github.io/Mars4_5.jar"
+
+# downloaded jars are kept here between runs, next to the ETag they were served with
+# and the sha256 of their contents:
+CACHE_DIR = Path("~/.cache/mips-tester").expanduser()
+
+# failed downloads are retried, waiting _BACKOFF seconds (doubled after each attempt)
+# when the error looks transient:
+_ATTEMPTS = 3
+_BACKOFF = 0.5
+_RETRY_STATUSES = (502, 503, 504)
+# seconds to wait for the server before an attempt fails:
+_TIMEOUT = 30
+
+# why download_mars failed when require_mars last called it, if it did:
+_download_error: Exception | None = None
+
+# test files are written to a RAM backed filesystem where available. a TMPDIR set by
+# the user (e.g. a RAM disk on macOS) takes precedence, as does the default temp dir
+# where there is no /dev/shm:
+SCRATCH_DIR = (
+    "/dev/shm" if "TMPDIR" not in os.environ and os.path.isdir("/dev/shm") else None
+)
+
+
+def _cached_jar() -> Path | None:
+    # the cached jar, if it exists and still matches the checksum it was stored with
+    jar = CACHE_DIR / "Mars4_5.jar"
+    checksum = jar.with_suffix(".sha256")
+    if not (jar.exists() and checksum.exists()):
+        return None
+    if hashlib.sha256(jar.read_bytes()).hexdigest() != checksum.read_text().strip():
+        return None
+    return jar
+
+
+def _install(jar: Path, mars_path: Path) -> None:
+    # copies jar to mars_path through a temporary file next to it, so a JVM started
+    # meanwhile (e.g. by another test worker) never reads a half written jar
+    fd, temp = tempfile.mkstemp(dir=mars_path.parent, suffix=".jar.part")
+    os.close(fd)
+    try:
+        shutil.copyfile(jar, temp)
+        os.replace(temp, mars_path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _download(headers: dict[str, str], partial: Path) -> http.client.HTTPMessage:
+    # downloads the jar into partial, resuming whatever an earlier failed attempt left
+    # there when the server still has the same jar (If-Range)
+    partial_etag = partial.with_name(partial.name + ".etag")
+    offset = partial.stat().st_size
+    if offset and partial_etag.exists():
+        request_headers = {
+            **headers,
+            "Range": f"bytes={offset}-",
+            "If-Range": partial_etag.read_text().strip(),
+        }
+    else:
+        request_headers = headers
+
+    try:
+        request = urllib.request.Request(MARS_URL, headers=request_headers)
+        response = urllib.request.urlopen(request, timeout=_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        if e.code != 416:
+            raise
+        # the partial download is already complete (or unusable), so start over
+        partial.write_bytes(b"")
+        partial_etag.unlink(missing_ok=True)
+        return _download(headers, partial)
+
+    resumed = response.status == 206
+    if not resumed:
+        # a new download, which can only be resumed later if it has an ETag
+        if "ETag" in response.headers:
+            partial_etag.write_text(response.headers["ETag"])
+        else:
+            partial_etag.unlink(missing_ok=True)
+    with response, open(partial, "ab" if resumed else "wb", buffering=0) as f:
+        # the whole jar is ~4 MB, so copy it in a few large unbuffered writes
+        shutil.copyfileobj(response, f, length=1024 * 1024)
+        # a connection dropped part way through just ends the copy, so check the
+        # response was read to the end
+        if response.length:
+            raise http.client.IncompleteRead(b"", response.length)
+    partial_etag.unlink(missing_ok=True)
+    return response.headers
 
 
 def download_mars(mars_path: Path) -> None:
     """Downloads the mars jar file to a given path
 
+    The jar is cached in ~/.cache/mips-tester. Later calls only ask the server whether
+    it has changed (using its ETag) and copy the cached jar when it has not. Transient
+    failures are retried, resuming from the bytes already downloaded. Several
+    processes (e.g. pytest-xdist workers) can download at once.
+
     Args:
         mars_path (Path): The path to download the mars jar file to
     """
-    url = "https://dpetersanderson.github.io/Mars4_5.jar"
+    jar = _cached_jar()
+    etag_file = CACHE_DIR / "Mars4_5.etag"
+    headers = dict()
+    if jar is not None and etag_file.exists():
+        headers["If-None-Match"] = etag_file.read_text().strip()
+
+    # each call downloads to its own file, so concurrent downloads never write to
+    # the same file. the finished download is moved into place in one step
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=CACHE_DIR, suffix=".jar.part")
+    os.close(fd)
+    partial = Path(partial)
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        with open(mars_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        for attempt in range(_ATTEMPTS):
+            try:
+                response_headers = _download(headers, partial)
+                break
+            except urllib.error.HTTPError as e:
+                # urlopen reports "not modified" as an error
+                if e.code == 304:
+                    _install(jar, mars_path)
+                    print(f"Mars JAR copied from cache to {mars_path}")
+                    return
+                if e.code not in _RETRY_STATUSES:
+                    raise
+                if attempt == _ATTEMPTS - 1 and jar is None:
+                    raise
+            except (urllib.error.URLError, http.client.HTTPException, OSError):
+                if attempt == _ATTEMPTS - 1 and jar is None:
+                    raise
+            if attempt < _ATTEMPTS - 1:
+                time.sleep(_BACKOFF * 2**attempt)
+        else:
+            # the server could not be reached, so fall back on the cached jar
+            _install(jar, mars_path)
+            print(f"Mars JAR server unavailable, copied cached JAR to {mars_path}")
+            return
+
+        with open(partial, "rb") as f:
+            checksum = hashlib.file_digest(f, "sha256").hexdigest()
+        jar = partial.replace(CACHE_DIR / "Mars4_5.jar")
+        jar.with_suffix(".sha256").write_text(checksum)
+        if "ETag" in response_headers:
+            etag_file.write_text(response_headers["ETag"])
+        else:
+            etag_file.unlink(missing_ok=True)
+
+        _install(jar, mars_path)
         print(f"Mars JAR downloaded successfully to {mars_path}")
-    except requests.exceptions.RequestException as e:
+    except urllib.error.URLError as e:
         print(f"Error downloading Mars JAR: {e}")
         raise
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         raise
+    finally:
+        partial.unlink(missing_ok=True)
+        partial.with_name(partial.name + ".etag").unlink(missing_ok=True)
+
+
+def require_mars(mars_path: Path) -> None:
+    """Makes sure the mars jar file exists, downloading it if it does not
+
+    Args:
+        mars_path (Path): The path the tests expect the mars jar file at
+
+    Raises:
+        unittest.SkipTest: If the mars jar file is missing and could not be downloaded
+    """
+    global _download_error
+    if mars_path.exists():
+        return
+    # a download that failed for one test module is not retried for the next
+    if _download_error is None:
+        try:
+            download_mars(mars_path)
+            return
+        except Exception as e:
+            _download_error = e
+    raise unittest.SkipTest(
+        f"mars.jar not found and could not be downloaded ({_download_error}). "
+        "Place mars.jar in the directory the tests are run from."
+    ) from _download_error
+
+
+def configure_scratch(**settings) -> TemporaryDirectory:
+    """Creates a scratch directory and configures mips_tester to write harnesses to it
+
+    mips_tester's config is global, so test modules call this once, in setUpModule.
+
+    Args:
+        **settings: Further settings passed on to mips_tester.configure
+
+    Returns:
+        TemporaryDirectory: The scratch directory, to clean up in tearDownModule
+    """
+    # imported here, so modules can import this file (and skip) before mips_tester
+    from mips_tester import configure
+
+    temp_dir = TemporaryDirectory(dir=SCRATCH_DIR)
+    configure(output_harness=str(Path(temp_dir.name) / "test_harness.asm"), **settings)
+    return temp_dir